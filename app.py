@@ -1,20 +1,152 @@
-from fastapi import FastAPI
+import asyncio
+import time
+import uuid
+from fastapi import FastAPI, Query as QueryParam
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional
 import socketio
+import psycopg
 from pydantic import BaseModel
 from chatbot.config import Config
-from chatbot.agent import Agent
-from chatbot.tools import Tools
-from chatbot.retrieval import Retriever
-from chatbot.database import Database
+from chatbot.database import Database, encode_cursor, decode_cursor
 from chatbot.session import SessionManager
+from chatbot.admission import AdmissionController, AdmissionRejected
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
+agent = None
+stats_engine = None
+stats_collections = []
+init_failed = False
+startup_timings = {}
+
+def timed_step(name):
+    start = time.perf_counter()
+    def done():
+        startup_timings[name] = round(time.perf_counter() - start, 3)
+    return done
+
+def load_agent_modules():
+    from chatbot.agent import Agent
+    from chatbot.tools import Tools
+    from chatbot.retrieval import Retriever
+    from chatbot.embeddings import warmup_embeddings, EmbeddingModelMismatch
+    from chatbot.function import get_pyplot
+    return Agent, Tools(), Retriever, warmup_embeddings, EmbeddingModelMismatch, get_pyplot
+
+async def initialize_agent():
+    global agent, stats_collections
+    done = timed_step('import_agent')
+    Agent, tools, Retriever, warmup_embeddings, EmbeddingModelMismatch, get_pyplot = await asyncio.to_thread(load_agent_modules)
+    done()
+    done = timed_step('embeddings')
+    await asyncio.to_thread(warmup_embeddings)
+    done()
+    done = timed_step('retrievers')
+    retrivals = await db.get_all_collections()
+    collections = []
+    for retrival in retrivals:
+        try:
+            retriver = await asyncio.to_thread(
+                Retriever,
+                chroma_host=retrival['host'],
+                chroma_port=retrival['port'],
+                collection_name=retrival['collection'],
+                description=retrival['description'],
+                search_kwargs={"k": retrival['search_k']},
+                search_type="similarity",
+                hash_collection=retrival['hash']
+            )
+        except EmbeddingModelMismatch as e:
+            print(f"Skipping retriever {retrival['collection']}: {e}")
+            continue
+        tools.add_retriever(retriver)
+        collections.append(retriver.collection)
+    done()
+    if Config.STARTUP_VERBOSE:
+        tools.print_all_tools()
+    done = timed_step('agent')
+    agent = await asyncio.to_thread(
+        Agent,
+        system_prompt=Config.SYSTEM_PROMPT, 
+        init_message=Config.BOT_INIT_MESSAGE,
+        tools=tools, stream=Config.USE_STREAM, 
+        session_get_func=session_manager.get_session_history,
+        speculative=Config.SPECULATIVE_RETRIEVAL,
+        speculative_max_collections=Config.SPECULATIVE_MAX_COLLECTIONS,
+        speculative_min_overlap=Config.SPECULATIVE_MIN_OVERLAP
+    )
+    done()
+    print(f"Agent ready: {startup_timings}")
+    await asyncio.to_thread(get_pyplot)
+    stats_collections = collections
+    if Config.STATS_FAST_PATH:
+        done = timed_step('stats_engine')
+        await build_stats_engine()
+        done()
+
+async def build_stats_engine():
+    global stats_engine
+    from chatbot.stats import StatsEngine
+    stats_engine = None
+    try:
+        stats_engine = await asyncio.to_thread(StatsEngine.from_collections, stats_collections, Config.STATS_MIN_CONFIDENCE)
+    except Exception as e:
+        print(f"Stats engine disabled, loading failed: {e!r}")
+        return
+    print(f"Stats engine loaded {len(stats_engine.table)} datapoints")
+
+def match_fast_path(question):
+    engine = stats_engine
+    if engine is None:
+        return None
+    match = engine.match(question)
+    return (engine, match) if match is not None else None
+
+async def answer_fast_path(fast_path, question, session_id):
+    engine, match = fast_path
+    answer = await engine.answer(match)
+    if answer is not None:
+        session_manager.add_user_message(session_id, question)
+        session_manager.add_ai_message(session_id, answer)
+    return answer
+
+async def refresh_collection_versions():
+    while True:
+        await asyncio.sleep(Config.COLLECTION_REFRESH_INTERVAL)
+        if agent is None:
+            continue
+        try:
+            invalidated = agent.tools.update_collection_versions(await db.get_collection_hashes())
+        except psycopg.Error as e:
+            print(f"Collection refresh failed: {e!r}")
+            continue
+        if invalidated:
+            print(f"Retrieval cache invalidated for: {invalidated}")
+            if Config.STATS_FAST_PATH:
+                await build_stats_engine()
+
+async def initialize_with_retry():
+    global agent, init_failed
+    for attempt in range(1, Config.INIT_MAX_ATTEMPTS + 1):
+        agent = None
+        try:
+            await initialize_agent()
+            startup_timings.pop('error', None)
+            return
+        except Exception as e:
+            agent = None
+            startup_timings['error'] = repr(e)
+            print(f"Agent initialization failed (attempt {attempt}/{Config.INIT_MAX_ATTEMPTS}): {e!r}")
+            if attempt < Config.INIT_MAX_ATTEMPTS:
+                await asyncio.sleep(min(Config.INIT_RETRY_MAX_DELAY, 2 ** attempt))
+    init_failed = True
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global db, agent, session_manager
-    tools = Tools()
+    global db, session_manager
     db = Database(
         dbname=Config.POSTGRES_DB,
         user=Config.POSTGRES_USER,
@@ -22,33 +154,32 @@ async def lifespan(app: FastAPI):
         host=Config.POSTGRES_HOST,
         port=Config.POSTGRES_PORT
     )
-    retrivals = await db.get_all_collections()
-    for retrival in retrivals:
-        retriver = Retriever(
-            chroma_host=retrival['host'],
-            chroma_port=retrival['port'],
-            collection_name=retrival['collection'],
-            description=retrival['description'],
-            search_kwargs={"k": retrival['search_k']},
-            search_type="similarity"
-        )
-        tools.add_retriever(retriver)
-    tools.print_all_tools()
     is_created = await db.create_chat_history_table()
     print(f"Chat history table created: {is_created}")
-    await db.print_chat_history_schema()
+    await db.create_indexes()
+    if Config.STARTUP_VERBOSE:
+        await db.print_chat_history_schema()
     session_manager = SessionManager(initial_message=Config.BOT_INIT_MESSAGE)
-    agent = Agent(
-        system_prompt=Config.SYSTEM_PROMPT, 
-        init_message=Config.BOT_INIT_MESSAGE,
-        tools=tools, stream=Config.USE_STREAM, 
-        session_get_func=session_manager.get_session_history
-    )
     app.mount("/graph", StaticFiles(directory="graph"), name="graph")
+    init_task = asyncio.create_task(initialize_with_retry())
+    refresh_task = asyncio.create_task(refresh_collection_versions())
     yield
+    refresh_task.cancel()
+    if not init_task.done():
+        init_task.cancel()
 
 app = FastAPI(lifespan=lifespan)
 
+admission = AdmissionController(
+    max_concurrent=Config.MAX_CONCURRENT_QUERIES,
+    max_per_user=Config.MAX_QUERIES_PER_USER,
+    max_per_sid=Config.MAX_QUERIES_PER_SID,
+    rate=Config.QUERY_RATE_PER_USER,
+    burst=Config.QUERY_BURST_PER_USER,
+    queue_timeout=Config.QUERY_QUEUE_TIMEOUT,
+    max_queued_per_user=Config.MAX_QUEUED_PER_USER
+)
+
 app.add_middleware(
     CORSMiddleware,
 	allow_origin_regex=Config.ALLOWED_ORIGINS,
@@ -70,21 +201,46 @@ class Query(BaseModel):
 class User(BaseModel):
     user_uuid: str
 
+async def emit_answer(sid, answer):
+    await sio.emit('response_start', True, room=sid)
+    await sio.emit('response', answer, room=sid)
+    await sio.emit('response_end', True, room=sid)
+
 @sio.event
 async def query(sid, query):
+    if agent is None:
+        await sio.emit('error', {'message': 'Service not ready.', 'retry_after': 1}, room=sid)
+        return
     if not session_manager.test_is_session_id(query['session_id']):
         await sio.emit('error', {'message': 'Session not found.'}, room=sid)
         return
-    if Config.USE_STREAM:
-        await sio.emit('response_start', True, room=sid)
-        async for result in agent.query_stream(query['question'], query['session_id']):
-            await sio.emit('response', result, room=sid)
-        await sio.emit('response_end', True, room=sid)
-    else:
-        await sio.emit('response_start', True, room=sid)
-        result = agent.query_invoke(query['question'], query['session_id'])
-        await sio.emit('response', result['output'], room=sid)
-        await sio.emit('response_end', True, room=sid)
+    fast_path = match_fast_path(query['question'])
+    if fast_path is not None and not fast_path[1]['chart']:
+        answer = await answer_fast_path(fast_path, query['question'], query['session_id'])
+        if answer is not None:
+            await emit_answer(sid, answer)
+            return
+        fast_path = None
+    user_key = session_manager.get_user_key(query['session_id'])
+    try:
+        async with admission.admit(user_key, sid):
+            if fast_path is not None:
+                answer = await answer_fast_path(fast_path, query['question'], query['session_id'])
+                if answer is not None:
+                    await emit_answer(sid, answer)
+                    return
+            if Config.USE_STREAM:
+                await sio.emit('response_start', True, room=sid)
+                async for result in agent.query_stream(query['question'], query['session_id']):
+                    await sio.emit('response', result, room=sid)
+                await sio.emit('response_end', True, room=sid)
+            else:
+                await sio.emit('response_start', True, room=sid)
+                result = await asyncio.to_thread(agent.query_invoke, query['question'], query['session_id'])
+                await sio.emit('response', result['output'], room=sid)
+                await sio.emit('response_end', True, room=sid)
+    except AdmissionRejected as e:
+        await sio.emit('error', e.to_dict(), room=sid)
 
 @sio.event
 async def connect(sid, environ):
@@ -109,8 +265,9 @@ async def init(sid, data):
         await sio.emit('error', {'message': 'User UUID is required.'}, room=sid)
         return
     session_id = session_manager.create_new_session(sid)
+    session_manager.map_session_to_user(session_id, user_uuid)
     await db.add_session(user_uuid, session_id)
-    await sio.emit('session_init', {'session_id': session_id, 'initial_message': agent.init_message}, room=sid)
+    await sio.emit('session_init', {'session_id': session_id, 'initial_message': session_manager.init_message}, room=sid)
     
 @sio.event
 async def restore_session(sid, data):
@@ -126,28 +283,86 @@ async def restore_session(sid, data):
         messages = await db.get_chat_messages(session_id)
         session_manager.insert_session_from_db(session_id, messages)
         session_manager.map_sid_to_session(sid, session_id)
+        user_uuid = await db.get_session_user(session_id)
+        if user_uuid:
+            session_manager.map_session_to_user(session_id, user_uuid)
         messages = session_manager.get_session_messages(session_id)
         await sio.emit('session_restored', {'session_id': session_id, 'chat_history': messages}, room=sid)
     else:
         session_id = session_manager.create_new_session(sid)
-        await sio.emit('session_init', {'session_id': session_id, 'initial_message': agent.init_message}, room=sid)
+        await sio.emit('session_init', {'session_id': session_id, 'initial_message': session_manager.init_message}, room=sid)
 
 @app.post("/api/v1/query")
 async def query(query: Query):
+    if agent is None:
+        return JSONResponse(status_code=503, content={'message': 'Service not ready.'}, headers={'Retry-After': '1'})
     if not session_manager.test_is_session_id(query.session_id):
         return {'message': 'Session not found.'}
-    return agent.query_invoke(query.question, query.session_id)
+    fast_path = match_fast_path(query.question)
+    if fast_path is not None and not fast_path[1]['chart']:
+        answer = await answer_fast_path(fast_path, query.question, query.session_id)
+        if answer is not None:
+            return {'input': query.question, 'output': answer}
+        fast_path = None
+    try:
+        async with admission.admit(session_manager.get_user_key(query.session_id)):
+            if fast_path is not None:
+                answer = await answer_fast_path(fast_path, query.question, query.session_id)
+                if answer is not None:
+                    return {'input': query.question, 'output': answer}
+            return await asyncio.to_thread(agent.query_invoke, query.question, query.session_id)
+    except AdmissionRejected as e:
+        return JSONResponse(status_code=429, content=e.to_dict(), headers={'Retry-After': str(e.retry_after)})
 
 @app.get("/api/v1/get_user_sessions/{user_uuid}")
-async def get_user_sessions(user_uuid: str):
-    sessions = await db.get_sessions(user_uuid)
-    if not sessions:
-        return {"session_ids": []}
-    return {"session_ids": sessions}
+async def get_user_sessions(user_uuid: str, cursor: Optional[str] = None, limit: int = QueryParam(Config.SESSIONS_PAGE_SIZE, ge=1, le=Config.MAX_PAGE_SIZE)):
+    after = None
+    if cursor:
+        try:
+            payload = decode_cursor(cursor)
+            after = (datetime.fromisoformat(payload['creation_date']), payload['session_id'])
+        except (ValueError, KeyError, TypeError):
+            return {"error": "Invalid cursor."}
+    try:
+        rows, has_more = await db.get_sessions_page(user_uuid, limit, after)
+    except psycopg.DataError:
+        return {"error": "Invalid cursor."}
+    next_cursor = None
+    if has_more:
+        last_session_id, last_creation_date = rows[-1]
+        next_cursor = encode_cursor({'creation_date': last_creation_date.isoformat(), 'session_id': str(last_session_id)})
+    return {"session_ids": [(session_id,) for session_id, _ in rows], "next_cursor": next_cursor}
 
 @app.get("/api/v1/get_session_history/{session_id}")
-async def get_history(session_id: str):
-    return session_manager.get_session_messages(session_id)
+async def get_history(session_id: str, cursor: Optional[str] = None, limit: int = QueryParam(Config.HISTORY_PAGE_SIZE, ge=1, le=Config.MAX_PAGE_SIZE)):
+    position, after_id = 0, None
+    if cursor:
+        try:
+            payload = decode_cursor(cursor)
+            position = int(payload['position'])
+            after_id = int(payload['id']) if payload.get('id') is not None else None
+            if position < 0:
+                raise ValueError(f"Negative cursor position: {position}")
+        except (ValueError, KeyError, TypeError):
+            return {"error": "Invalid cursor."}
+    if session_manager.test_is_session_id(session_id):
+        messages, next_position = session_manager.get_session_messages_page(session_id, limit, position)
+        next_cursor = encode_cursor({'position': next_position}) if next_position is not None else None
+        return {"messages": messages, "next_cursor": next_cursor}
+    try:
+        uuid.UUID(session_id)
+    except ValueError:
+        return {"error": "Session not found."}
+    try:
+        messages, last_id, has_more = await db.get_chat_messages_page(session_id, limit, after_id=after_id, offset=position)
+    except psycopg.DataError:
+        return {"error": "Invalid cursor."}
+    if not messages and not position:
+        return {"error": "Session not found."}
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor({'position': position + len(messages), 'id': last_id})
+    return {"messages": [session_manager.serialize_message(msg) for msg in messages], "next_cursor": next_cursor}
 
 @app.get("/api/v1/check_user_exists/{user_uuid}")
 async def get_user(user_uuid: str):
@@ -164,4 +379,20 @@ async def create_user():
 
 @app.get("/api/v1/health")
 async def health():
+    if init_failed:
+        return JSONResponse(status_code=503, content={"status": "error", "error": startup_timings.get('error')})
     return {"status": "ok"}
+
+@app.get("/api/v1/metrics")
+async def metrics():
+    return {
+        "admission": admission.get_stats(),
+        "retrieval_cache": agent.tools.retrieval_cache.get_stats() if agent else None,
+        "speculation": agent.speculation_stats.get_stats() if agent else None
+    }
+
+@app.get("/api/v1/ready")
+async def ready():
+    if agent is None:
+        return JSONResponse(status_code=503, content={"status": "starting", "timings": startup_timings})
+    return {"status": "ready", "timings": startup_timings}
@@ -0,0 +1,56 @@
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from chatbot.embeddings import create_embeddings, LocalEmbeddings
+
+QUERIES = [
+    "Combien d'étudiants en Lettres en 2022 ?",
+    "Nombre de doctorants à la Faculté de biologie et de médecine",
+    "Évolution du personnel administratif et technique",
+    "Financement de l'État de Vaud pour le budget ordinaire",
+    "Répartition hommes femmes en Sciences sociales et politiques",
+    "Contributions des autres cantons en 2021",
+]
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def run(backend, model_name, requests, concurrency):
+    embeddings = create_embeddings(backend, model_name)
+    if isinstance(embeddings, LocalEmbeddings):
+        embeddings.warmup()
+    else:
+        embeddings.embed_query(QUERIES[0])
+    queries = [QUERIES[i % len(QUERIES)] for i in range(requests)]
+
+    sequential = [timed(embeddings.embed_query, query) for query in queries]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        concurrent = list(pool.map(lambda query: timed(embeddings.embed_query, query), queries))
+    elapsed = time.perf_counter() - start
+
+    print(f"{backend}:{model_name}")
+    print(f"  sequential  p50={statistics.median(sequential) * 1000:.1f}ms p95={percentile(sequential, 95) * 1000:.1f}ms")
+    print(f"  concurrent  p50={statistics.median(concurrent) * 1000:.1f}ms p95={percentile(concurrent, 95) * 1000:.1f}ms")
+    print(f"  throughput  {requests / elapsed:.1f} req/s with {concurrency} threads")
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare embedding backends latency and throughput.")
+    parser.add_argument("--local-model", default="paraphrase-multilingual-MiniLM-L12-v2")
+    parser.add_argument("--openai-model", default="text-embedding-3-small")
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--skip-openai", action="store_true")
+    args = parser.parse_args()
+
+    run("local", args.local_model, args.requests, args.concurrency)
+    if not args.skip_openai:
+        run("openai", args.openai_model, args.requests, args.concurrency)
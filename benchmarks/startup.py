@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+MODULES = [
+    "fastapi",
+    "socketio",
+    "psycopg",
+    "langchain_postgres",
+    "chatbot.database",
+    "chatbot.session",
+    "chatbot.admission",
+    "matplotlib.pyplot",
+    "chromadb",
+    "langchain_openai",
+    "langchain.agents",
+    "chatbot.embeddings",
+    "chatbot.function",
+    "chatbot.tools",
+    "chatbot.retrieval",
+    "chatbot.agent",
+    "app",
+]
+
+def measure_import(module):
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+def measure_init(with_retrievers):
+    from chatbot.config import Config
+    timings = {}
+
+    start = time.perf_counter()
+    from chatbot.tools import Tools
+    tools = Tools()
+    timings['Tools()'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    from chatbot.embeddings import warmup_embeddings
+    warmup_embeddings()
+    timings['warmup_embeddings()'] = time.perf_counter() - start
+
+    if with_retrievers:
+        from chatbot.database import Database
+        from chatbot.retrieval import Retriever
+        db = Database(
+            dbname=Config.POSTGRES_DB,
+            user=Config.POSTGRES_USER,
+            password=Config.POSTGRES_PASSWORD,
+            host=Config.POSTGRES_HOST,
+            port=Config.POSTGRES_PORT
+        )
+        for retrival in asyncio.run(db.get_all_collections()):
+            start = time.perf_counter()
+            tools.add_retriever(Retriever(
+                chroma_host=retrival['host'],
+                chroma_port=retrival['port'],
+                collection_name=retrival['collection'],
+                description=retrival['description'],
+                search_kwargs={"k": retrival['search_k']}
+            ))
+            timings[f"Retriever({retrival['collection']})"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    from chatbot.agent import Agent
+    from chatbot.session import SessionManager
+    Agent(
+        system_prompt=Config.SYSTEM_PROMPT,
+        init_message=Config.BOT_INIT_MESSAGE,
+        tools=tools, stream=Config.USE_STREAM,
+        session_get_func=SessionManager().get_session_history
+    )
+    timings['Agent()'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    from chatbot.function import get_pyplot
+    get_pyplot()
+    timings['get_pyplot()'] = time.perf_counter() - start
+    return timings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report import and initialization cost per module.")
+    parser.add_argument("--with-retrievers", action="store_true", help="Also connect to Postgres and Chroma to build the retrievers.")
+    parser.add_argument("--skip-init", action="store_true")
+    args = parser.parse_args()
+
+    print("Import time (fresh interpreter per module)")
+    for module in MODULES:
+        duration = measure_import(module)
+        print(f"  {module:<24} {'failed' if duration is None else f'{duration * 1000:8.1f}ms'}")
+
+    if not args.skip_init:
+        print("Initialization time")
+        for name, duration in measure_init(args.with_retrievers).items():
+            print(f"  {name:<40} {duration * 1000:8.1f}ms")
@@ -0,0 +1,166 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+class AdmissionRejected(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.message = message
+        self.retry_after = retry_after
+
+    def to_dict(self):
+        return {
+            'message': self.message,
+            'retry_after': self.retry_after
+        }
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def retry_after(self) -> float:
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def try_acquire(self) -> float:
+        retry_after = self.retry_after()
+        if not retry_after:
+            self.tokens -= 1
+        return retry_after
+
+    def is_full(self):
+        self._refill()
+        return self.tokens >= self.capacity
+
+class AdmissionController:
+    def __init__(self, max_concurrent=8, max_per_user=2, max_per_sid=1, rate=0.2, burst=5, queue_timeout=30.0, max_queued_per_user=2):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_per_sid = max_per_sid
+        self.rate = rate
+        self.burst = burst
+        self.queue_timeout = queue_timeout
+        self.max_queued_per_user = max_queued_per_user
+        self.active = 0
+        self.user_running = defaultdict(int)
+        self.sid_counts = defaultdict(int)
+        self.buckets = {}
+        self.waiters: "OrderedDict[str, deque]" = OrderedDict()
+
+    def _get_bucket(self, user_key):
+        if user_key not in self.buckets:
+            self._prune_buckets()
+            self.buckets[user_key] = TokenBucket(self.rate, self.burst)
+        return self.buckets[user_key]
+
+    def _prune_buckets(self):
+        for user_key in [key for key, bucket in self.buckets.items() if bucket.is_full() and key not in self.user_running and key not in self.waiters]:
+            del self.buckets[user_key]
+
+    def _rate_limited(self, retry_after):
+        return AdmissionRejected("Rate limit exceeded.", math.ceil(retry_after))
+
+    def _check_limits(self, user_key, sid):
+        if sid is not None and self.sid_counts.get(sid, 0) >= self.max_per_sid:
+            raise AdmissionRejected("A query is already running for this connection.", 1)
+        if len(self.waiters.get(user_key, ())) >= self.max_queued_per_user:
+            raise AdmissionRejected("Too many queued queries for this user.", math.ceil(self.queue_timeout))
+        retry_after = self._get_bucket(user_key).retry_after()
+        if retry_after:
+            raise self._rate_limited(retry_after)
+
+    def _dispatch(self):
+        progressed = True
+        while progressed and self.active < self.max_concurrent:
+            progressed = False
+            for user_key in list(self.waiters):
+                if self.active >= self.max_concurrent:
+                    break
+                if self.user_running.get(user_key, 0) >= self.max_per_user:
+                    continue
+                queue = self.waiters[user_key]
+                future = queue.popleft()
+                if queue:
+                    self.waiters.move_to_end(user_key)
+                else:
+                    del self.waiters[user_key]
+                progressed = True
+                if future.done():
+                    continue
+                retry_after = self._get_bucket(user_key).try_acquire()
+                if retry_after:
+                    future.set_exception(self._rate_limited(retry_after))
+                    continue
+                self.active += 1
+                self.user_running[user_key] += 1
+                future.set_result(True)
+
+    async def _acquire(self, user_key):
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(user_key, deque()).append(future)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self._release(user_key)
+            elif not future.done():
+                future.cancel()
+                self._remove_waiter(user_key, future)
+            if isinstance(e, asyncio.TimeoutError):
+                raise AdmissionRejected("Server is busy, please retry later.", math.ceil(self.queue_timeout))
+            raise
+
+    def _remove_waiter(self, user_key, future):
+        queue = self.waiters.get(user_key)
+        if queue is None:
+            return
+        if future in queue:
+            queue.remove(future)
+        if not queue:
+            del self.waiters[user_key]
+
+    def _release(self, user_key):
+        self.active -= 1
+        self.user_running[user_key] -= 1
+        if not self.user_running[user_key]:
+            del self.user_running[user_key]
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, user_key: str, sid: Optional[str] = None):
+        self._check_limits(user_key, sid)
+        if sid is not None:
+            self.sid_counts[sid] += 1
+        try:
+            await self._acquire(user_key)
+            try:
+                yield
+            finally:
+                self._release(user_key)
+        finally:
+            if sid is not None:
+                self.sid_counts[sid] -= 1
+                if not self.sid_counts[sid]:
+                    del self.sid_counts[sid]
+
+    def get_stats(self):
+        return {
+            'active': self.active,
+            'queued': sum(len(queue) for queue in self.waiters.values()),
+            'users_running': len(self.user_running),
+            'users_waiting': len(self.waiters)
+        }
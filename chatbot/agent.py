@@ -3,9 +3,10 @@ from langchain.agents import create_tool_calling_agent, AgentExecutor
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.prompts import ChatPromptTemplate
 from .tools import Tools
+from .speculation import CollectionRouter, Speculation, SpeculationStats, current_speculation
 class Agent:
 
-    def __init__(self, system_prompt, init_message, session_get_func, tools=None, stream=True):
+    def __init__(self, system_prompt, init_message, session_get_func, tools=None, stream=True, speculative=False, speculative_max_collections=2, speculative_min_overlap=0.5):
         self.init_message = init_message
         self.system_prompt = system_prompt
         self.use_stream = stream
@@ -21,6 +22,19 @@ class Agent:
         self.agent = create_tool_calling_agent(self.llm, tools=self.tools.get_all_tools(), prompt=self.prompt)
         self.agent_executor = AgentExecutor(agent=self.agent, tools=self.tools.get_all_tools(), verbose=True)
         self.agent_with_chat_history = RunnableWithMessageHistory(self.agent_executor, self.session_get_history, history_messages_key="chat_history", input_messages_key="input")
+        self.speculative = speculative
+        self.speculative_max_collections = speculative_max_collections
+        self.speculative_min_overlap = speculative_min_overlap
+        self.speculation_stats = SpeculationStats()
+        self.router = CollectionRouter(self.tools.get_retriever_descriptions())
+
+    def speculate(self, input_message):
+        speculation = Speculation(input_message, self.speculation_stats, self.speculative_min_overlap)
+        for collection_name in self.router.route(input_message, self.speculative_max_collections):
+            retriever = self.tools.get_cached_retriever(collection_name)
+            if retriever is not None:
+                speculation.launch(collection_name, retriever.afetch(input_message))
+        return speculation
     
     def query_invoke(self, input_message, session_id):
         return self.agent_with_chat_history.invoke(
@@ -38,6 +52,20 @@ class Agent:
         )
     
     async def query_stream(self, input_message, session_id):
+        speculation = self.speculate(input_message) if self.speculative else None
+        token = current_speculation.set(speculation)
+        try:
+            async for content in self._stream_events(input_message, session_id):
+                yield content
+        finally:
+            if speculation is not None:
+                speculation.cancel()
+            try:
+                current_speculation.reset(token)
+            except ValueError:
+                pass
+
+    async def _stream_events(self, input_message, session_id):
         async for event in self.agent_with_chat_history.astream_events(
             {
                 "input": input_message
@@ -0,0 +1,117 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, List
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from .speculation import current_speculation
+
+def normalize_query(query: str) -> str:
+    return ' '.join(query.casefold().split())
+
+def documents_size(documents: List[Document]) -> int:
+    return sum(len(doc.page_content.encode()) + len(json.dumps(doc.metadata, default=str)) for doc in documents)
+
+class RetrievalCache:
+    def __init__(self, max_entries=1024, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.versions = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def make_key(self, collection_name, query, k):
+        return (collection_name, self.versions.get(collection_name), normalize_query(query), k)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, documents):
+        size = documents_size(documents)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key[1] != self.versions.get(key[0]):
+                return
+            if key in self.entries:
+                self.bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (documents, size)
+            self.bytes += size
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def set_version(self, collection_name, version):
+        with self.lock:
+            if self.versions.get(collection_name) == version:
+                return False
+            self.versions[collection_name] = version
+            self._drop_collection(collection_name)
+            return True
+
+    def _drop_collection(self, collection_name):
+        for key in [key for key in self.entries if key[0] == collection_name]:
+            self.bytes -= self.entries.pop(key)[1]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def get_stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+class CachedRetriever(BaseRetriever):
+    retriever: BaseRetriever
+    cache: Any
+    collection_name: str
+    k: int
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        key = self.cache.make_key(self.collection_name, query, self.k)
+        documents = self.cache.get(key)
+        if documents is None:
+            documents = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+            self.cache.put(key, documents)
+        return documents
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        speculation = current_speculation.get()
+        if speculation is not None:
+            documents = await speculation.take(self.collection_name, query)
+            if documents is not None:
+                return documents
+        return await self.afetch(query, callbacks=run_manager.get_child())
+
+    def make_key(self, query: str):
+        return self.cache.make_key(self.collection_name, query, self.k)
+
+    async def afetch(self, query: str, callbacks=None) -> List[Document]:
+        key = self.make_key(query)
+        documents = self.cache.get(key)
+        if documents is None:
+            documents = await self.retriever.ainvoke(query, config={"callbacks": callbacks})
+            self.cache.put(key, documents)
+        return documents
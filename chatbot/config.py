@@ -10,8 +10,22 @@ class Config:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     CHROMADB_HOST = os.getenv("CHROMADB_HOST")
     CHROMADB_PORT = int(os.getenv("CHROMADB_PORT"))
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "paraphrase-multilingual-MiniLM-L12-v2" if EMBEDDING_BACKEND == "local" else "text-embedding-3-small")
+    EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+    EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", 5))
+    EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", 1))
     BOT_INIT_MESSAGE = os.getenv("BOT_INIT_MESSAGE")
     USE_STREAM = bool(os.getenv("USE_STREAM") == "True")
+    SPECULATIVE_RETRIEVAL = bool(os.getenv("SPECULATIVE_RETRIEVAL") == "True")
+    SPECULATIVE_MAX_COLLECTIONS = int(os.getenv("SPECULATIVE_MAX_COLLECTIONS", 2))
+    SPECULATIVE_MIN_OVERLAP = float(os.getenv("SPECULATIVE_MIN_OVERLAP", 0.5))
+    STATS_FAST_PATH = bool(os.getenv("STATS_FAST_PATH") == "True")
+    STATS_MIN_CONFIDENCE = float(os.getenv("STATS_MIN_CONFIDENCE", 0.8))
+    INIT_MAX_ATTEMPTS = int(os.getenv("INIT_MAX_ATTEMPTS", 5))
+    INIT_RETRY_MAX_DELAY = float(os.getenv("INIT_RETRY_MAX_DELAY", 60))
+    STARTUP_VERBOSE = bool(os.getenv("STARTUP_VERBOSE") == "True")
     SYSTEM_PROMPT = f"""
         Tu es un assistant data science pour l'Université de Lausanne.
         Tu es chargé de répondre à des questions sur les statistiques de l'Université.
@@ -43,5 +57,23 @@ class Config:
     PUBLIC_IP = os.getenv('PUBLIC_IP', 'localhost')
     DOMAIN_NAME = os.getenv('DOMAIN_NAME', 'localhost')
     ALLOWED_ORIGINS = r"^(https?:\/\/chatbot\.unisis\.ch|http:\/\/localhost(:\d+)?)$"
+    RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv('RETRIEVAL_CACHE_MAX_ENTRIES', 1024))
+    RETRIEVAL_CACHE_MAX_BYTES = int(os.getenv('RETRIEVAL_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    COLLECTION_REFRESH_INTERVAL = float(os.getenv('COLLECTION_REFRESH_INTERVAL', 60))
+    HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', 50))
+    SESSIONS_PAGE_SIZE = int(os.getenv('SESSIONS_PAGE_SIZE', 50))
+    MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 200))
+    MAX_CONCURRENT_QUERIES = int(os.getenv('MAX_CONCURRENT_QUERIES', 8))
+    MAX_QUERIES_PER_USER = int(os.getenv('MAX_QUERIES_PER_USER', 2))
+    MAX_QUERIES_PER_SID = int(os.getenv('MAX_QUERIES_PER_SID', 1))
+    MAX_QUEUED_PER_USER = int(os.getenv('MAX_QUEUED_PER_USER', 2))
+    QUERY_RATE_PER_USER = float(os.getenv('QUERY_RATE_PER_USER', 0.2))
+    QUERY_BURST_PER_USER = int(os.getenv('QUERY_BURST_PER_USER', 5))
+    QUERY_QUEUE_TIMEOUT = float(os.getenv('QUERY_QUEUE_TIMEOUT', 30))
     GRAPH_DIRECTORY = 'graph'
-    FULL_GRAPH_DIRECTORY = f'http://{DOMAIN_NAME}/{GRAPH_DIRECTORY}'
\ No newline at end of file
+    FULL_GRAPH_DIRECTORY = f'http://{DOMAIN_NAME}/{GRAPH_DIRECTORY}'
+    GRAPH_FORMAT = os.getenv('GRAPH_FORMAT', 'png')
+    GRAPH_DPI = int(os.getenv('GRAPH_DPI', 100))
+    GRAPH_WEBP_QUALITY = int(os.getenv('GRAPH_WEBP_QUALITY', 80))
+    GRAPH_MAX_POINTS = int(os.getenv('GRAPH_MAX_POINTS', 60))
+    GRAPH_LABEL_THRESHOLD = int(os.getenv('GRAPH_LABEL_THRESHOLD', 15))
\ No newline at end of file
@@ -1,7 +1,22 @@
 import psycopg
 from langchain_postgres import PostgresChatMessageHistory
+from langchain_core.messages import messages_from_dict
+import base64
+import json
 import uuid
 
+def encode_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(payload, dict):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return payload
+
 class Database:
     def __init__(self, dbname, user, password, host, port):
         self.connect_url = f"postgresql://{user}:{password}@{host}:{port}/{dbname}"
@@ -52,6 +67,12 @@ class Database:
                     )
                 return json_collections
     
+    async def get_collection_hashes(self):
+        async with await self.connect() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT collection_name, hash_collection FROM collections")
+                return {name: hash_ for name, hash_ in await cursor.fetchall()}
+
     async def get_collection(self, collection_name):
         async with await self.connect() as conn:
             async with conn.cursor() as cursor:
@@ -87,6 +108,19 @@ class Database:
                 return True
         return False
     
+    async def create_indexes(self):
+        async with await self.connect() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_sessions_users_user_uuid_creation_date
+                    ON sessions_users (user_uuid, creation_date, session_id)
+                """)
+                await cursor.execute(f"""
+                    CREATE INDEX IF NOT EXISTS idx_{self.chat_history_table_name}_session_id_id
+                    ON {self.chat_history_table_name} (session_id, id)
+                """)
+                await conn.commit()
+
     async def test_if_chat_history_exists(self, session_id):
         async with await self.connect() as conn:
             async with conn.cursor() as cursor:
@@ -109,6 +143,28 @@ class Database:
             chat_history = PostgresChatMessageHistory(self.chat_history_table_name, session_id, async_connection=conn)
             return await chat_history.aget_messages()
     
+    async def get_chat_messages_page(self, session_id, limit, after_id=None, offset=0):
+        async with await self.connect() as conn:
+            async with conn.cursor() as cursor:
+                if after_id is not None:
+                    await cursor.execute(f"""
+                        SELECT id, message FROM {self.chat_history_table_name}
+                        WHERE session_id = %s AND id > %s
+                        ORDER BY id ASC LIMIT %s
+                    """, (session_id, after_id, limit + 1))
+                else:
+                    await cursor.execute(f"""
+                        SELECT id, message FROM {self.chat_history_table_name}
+                        WHERE session_id = %s
+                        ORDER BY id ASC LIMIT %s OFFSET %s
+                    """, (session_id, limit + 1, offset))
+                rows = await cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        messages = messages_from_dict([row[1] for row in rows])
+        last_id = rows[-1][0] if rows else after_id
+        return messages, last_id, has_more
+
     async def print_chat_history_schema(self):
         async with await self.connect() as conn:
             async with conn.cursor() as cursor:
@@ -157,4 +213,30 @@ class Database:
         async with await self.connect() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute("SELECT session_id FROM sessions_users WHERE user_uuid = %s ORDER BY creation_date ASC", (user_uuid,))
-                return await cursor.fetchall()
\ No newline at end of file
+                return await cursor.fetchall()
+
+    async def get_session_user(self, session_id):
+        async with await self.connect() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT user_uuid FROM sessions_users WHERE session_id = %s", (session_id,))
+                row = await cursor.fetchone()
+                return str(row[0]) if row else None
+
+    async def get_sessions_page(self, user_uuid, limit, after=None):
+        async with await self.connect() as conn:
+            async with conn.cursor() as cursor:
+                if after is not None:
+                    await cursor.execute("""
+                        SELECT session_id, creation_date FROM sessions_users
+                        WHERE user_uuid = %s AND (creation_date, session_id) > (%s, %s)
+                        ORDER BY creation_date ASC, session_id ASC LIMIT %s
+                    """, (user_uuid, after[0], after[1], limit + 1))
+                else:
+                    await cursor.execute("""
+                        SELECT session_id, creation_date FROM sessions_users
+                        WHERE user_uuid = %s
+                        ORDER BY creation_date ASC, session_id ASC LIMIT %s
+                    """, (user_uuid, limit + 1))
+                rows = await cursor.fetchall()
+        has_more = len(rows) > limit
+        return rows[:limit], has_more
\ No newline at end of file
@@ -1,4 +1,103 @@
-from langchain_openai import OpenAIEmbeddings
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import List
+from langchain_core.embeddings import Embeddings
+from .config import Config
 
+EMBEDDING_MODEL_METADATA_KEY = 'embedding_model'
+LEGACY_EMBEDDING_MODEL = 'openai:text-embedding-3-small'
+
+class EmbeddingModelMismatch(ValueError):
+    pass
+
+class LocalEmbeddings(Embeddings):
+    def __init__(self, model_name, device='cpu', max_batch_size=32, max_wait_ms=5, num_workers=1):
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device=device)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix='embeddings')
+        self.pending = queue.Queue()
+        self.collector = threading.Thread(target=self._collect, name='embeddings-batcher', daemon=True)
+        self.collector.start()
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        return self.model.encode(texts, batch_size=self.max_batch_size, normalize_embeddings=True, convert_to_numpy=True).tolist()
+
+    def _collect(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.max_wait
+            try:
+                while len(batch) < self.max_batch_size:
+                    batch.append(self.pending.get(timeout=max(0, deadline - time.monotonic())))
+            except queue.Empty:
+                pass
+            self.executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch):
+        try:
+            vectors = self._encode([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        self.pending.put((text, future))
+        return future
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self.submit(text))
+
+    def warmup(self):
+        self.embed_query("warmup")
+
+def get_embedding_model_id():
+    if Config.EMBEDDING_BACKEND == 'local':
+        return f"local:{Config.EMBEDDING_MODEL}"
+    return f"openai:{Config.EMBEDDING_MODEL}"
+
+def check_collection_embedding_model(collection):
+    metadata = collection.metadata or {}
+    recorded = metadata.get(EMBEDDING_MODEL_METADATA_KEY, LEGACY_EMBEDDING_MODEL)
+    expected = get_embedding_model_id()
+    if recorded != expected:
+        raise EmbeddingModelMismatch(f"Collection {collection.name} was built with {recorded} but the configured embedding model is {expected}")
+
+def create_embeddings(backend, model_name):
+    if backend == 'local':
+        return LocalEmbeddings(
+            model_name=model_name,
+            device=Config.EMBEDDING_DEVICE,
+            max_batch_size=Config.EMBEDDING_BATCH_SIZE,
+            max_wait_ms=Config.EMBEDDING_BATCH_WAIT_MS,
+            num_workers=Config.EMBEDDING_WORKERS
+        )
+    if backend == 'openai':
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(model=model_name)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+@lru_cache(maxsize=None)
 def initialize_embeddings():
-    return OpenAIEmbeddings(model="text-embedding-3-small")
+    return create_embeddings(Config.EMBEDDING_BACKEND, Config.EMBEDDING_MODEL)
+
+def warmup_embeddings():
+    embeddings = initialize_embeddings()
+    if isinstance(embeddings, LocalEmbeddings):
+        embeddings.warmup()
@@ -1,15 +1,56 @@
-import matplotlib
-matplotlib.use('agg')
-import matplotlib.pyplot as plt
+import numpy as np
 import os
-from typing import List
+import threading
+from typing import List, Literal, Optional
 from .config import Config
 import hashlib
 import math
+from functools import lru_cache
 from langchain.pydantic_v1 import BaseModel, Field
 from langchain.tools import BaseTool
 from langchain.tools import tool
 
+GraphFormat = Literal['png', 'webp', 'svg']
+
+render_lock = threading.Lock()
+
+@lru_cache(maxsize=None)
+def get_pyplot():
+    import matplotlib
+    matplotlib.use('agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def downsample(x, series, max_points):
+    x = np.asarray(x)
+    series = np.asarray(series)
+    if x.shape[0] <= max_points:
+        return x, series
+    indices = np.unique(np.linspace(0, x.shape[0] - 1, max_points).round().astype(int))
+    return x[indices], series[:, indices]
+
+def thin_labels(values, threshold, fmt='{}'):
+    step = max(1, math.ceil(len(values) / threshold))
+    return [fmt.format(value) if i % step == 0 or i == len(values) - 1 else '' for i, value in enumerate(values)]
+
+def save_graph(file_name_non_hashed, output_format=None):
+    plt = get_pyplot()
+    output_format = output_format or Config.GRAPH_FORMAT
+    file_name = hashlib.sha256(f'{file_name_non_hashed}-{output_format}-{Config.GRAPH_DPI}'.encode()).hexdigest()
+    if not os.path.exists(Config.GRAPH_DIRECTORY):
+        os.makedirs(Config.GRAPH_DIRECTORY)
+
+    file_path = os.path.join(Config.GRAPH_DIRECTORY, f'{file_name}.{output_format}')
+    if output_format == 'png':
+        plt.savefig(file_path, bbox_inches='tight', dpi=Config.GRAPH_DPI, pil_kwargs={'optimize': True})
+    elif output_format == 'webp':
+        plt.savefig(file_path, bbox_inches='tight', dpi=Config.GRAPH_DPI, pil_kwargs={'quality': Config.GRAPH_WEBP_QUALITY, 'method': 6})
+    else:
+        plt.savefig(file_path, bbox_inches='tight', format='svg', metadata={'Date': None})
+    plt.close()
+
+    return f"{Config.FULL_GRAPH_DIRECTORY}/{file_name}.{output_format}"
+
 class LineGraph(BaseModel):
     year: List[int] = Field(..., description="La liste des années pour créer le graphique.")
     data: List[List[int]] = Field(..., description="La liste des séries de données pour créer le graphique.")
@@ -18,21 +59,33 @@ class LineGraph(BaseModel):
     x_label: str = Field(..., description="L'étiquette de l'axe des x. (en français) est obligatoire.")
     y_label: str = Field(..., description="L'étiquette de l'axe des y. (en français) est obligatoire.")
     is_start_zero: bool = Field(..., description="Définir si l'axe des y doit commencer à zéro.")
+    output_format: Optional[GraphFormat] = Field(None, description="Le format de l'image (png, webp ou svg). Laisser vide pour le format par défaut.")
 
 @tool("create_line_graph", args_schema=LineGraph)
-async def create_line_graph(year: List[int], data: List[List[int]], labels: List[str], title: str, x_label: str, y_label: str, is_start_zero: bool):
+async def create_line_graph(year: List[int], data: List[List[int]], labels: List[str], title: str, x_label: str, y_label: str, is_start_zero: bool, output_format: Optional[str] = None):
     """Ce tool permet de créer un graphique en courbe à partir des données fournies."""
+    return render_line_graph(year, data, labels, title, x_label, y_label, is_start_zero, output_format)
+
+def render_line_graph(year, data, labels, title, x_label, y_label, is_start_zero, output_format=None):
+    with render_lock:
+        return _render_line_graph(year, data, labels, title, x_label, y_label, is_start_zero, output_format)
+
+def _render_line_graph(year, data, labels, title, x_label, y_label, is_start_zero, output_format):
+    plt = get_pyplot()
 
     plt.figure(figsize=(10, 5))
 
     if is_start_zero:
         plt.ylim(0, max([max(series) for series in data]) * 1.1)
 
-    for i, series in enumerate(data):
+    x, series_array = downsample(year, data, Config.GRAPH_MAX_POINTS)
+    marker = 'o' if x.shape[0] <= Config.GRAPH_LABEL_THRESHOLD else None
+    for i, series in enumerate(series_array):
         label = labels[i]
-        plt.plot(year, series, marker='o', linestyle='-', label=label)
-        for j, value in enumerate(series):
-            plt.annotate(value, (year[j], value), textcoords="offset points", xytext=(0,10), ha='center')
+        plt.plot(x, series, marker=marker, linestyle='-', label=label)
+        for x_value, value, text in zip(x, series, thin_labels(series.tolist(), Config.GRAPH_LABEL_THRESHOLD)):
+            if text:
+                plt.annotate(text, (x_value, value), textcoords="offset points", xytext=(0,10), ha='center')
 
     plt.title(title)
     plt.xlabel(x_label)
@@ -44,15 +97,7 @@ async def create_line_graph(year: List[int], data: List[List[int]], labels: List
     data_str = '-'.join(['-'.join([str(i) for i in series]) for series in data])
     label_str = '-'.join(labels)
     file_name_non_hashed = f'{year_str}-{data_str}-{label_str}-{title}-{x_label}-{y_label}-{is_start_zero}'
-    file_name = hashlib.sha256(file_name_non_hashed.encode()).hexdigest()
-    if not os.path.exists(Config.GRAPH_DIRECTORY):
-        os.makedirs(Config.GRAPH_DIRECTORY)
-   
-    file_path = os.path.join(Config.GRAPH_DIRECTORY, f'{file_name}.png')
-    plt.savefig(file_path, bbox_inches='tight')
-    plt.close()
-    
-    return f"{Config.FULL_GRAPH_DIRECTORY}/{file_name}.png"
+    return save_graph(file_name_non_hashed, output_format)
 
 class BarGraph(BaseModel):
     categories: List[str] = Field(..., description="Les catégories pour le graphique en barres.")
@@ -62,113 +107,98 @@ class BarGraph(BaseModel):
     x_label: str = Field(..., description="L'étiquette de l'axe des x. (en français)")
     y_label: str = Field(..., description="L'étiquette de l'axe des y. (en français)")
     is_start_zero: bool = Field(..., description="Définir si l'axe des y doit commencer à zéro.")
+    output_format: Optional[GraphFormat] = Field(None, description="Le format de l'image (png, webp ou svg). Laisser vide pour le format par défaut.")
 
 @tool("create_bar_graph", args_schema=BarGraph)
-async def create_bar_graph(categories: List[str], values: List[List[float]], labels: List[str], title: str, x_label: str, y_label: str, is_start_zero: bool):
+async def create_bar_graph(categories: List[str], values: List[List[float]], labels: List[str], title: str, x_label: str, y_label: str, is_start_zero: bool, output_format: Optional[str] = None):
     """Ce tool permet de créer un graphique en barres à partir des données fournies."""
+    with render_lock:
+        plt = get_pyplot()
 
-    plt.figure(figsize=(10, 5))
+        plt.figure(figsize=(10, 5))
     
-    x = range(len(categories))
+        x = np.arange(len(categories))
     
-    if is_start_zero:
-        plt.ylim(0, max([max(series) for series in values]) * 1.1)
+        if is_start_zero:
+            plt.ylim(0, max([max(series) for series in values]) * 1.1)
     
-    bar_width = 0.2 
-    for i, series in enumerate(values):
-        plt.bar([p + bar_width * i for p in x], series, width=bar_width, label=labels[i])
-        for j, value in enumerate(series):
-            plt.text(x[j] + bar_width * i, value, f'{value:.2f}', ha='center', va='bottom')
+        bar_width = 0.2 
+        for i, series in enumerate(values):
+            bars = plt.bar(x + bar_width * i, series, width=bar_width, label=labels[i])
+            plt.bar_label(bars, labels=thin_labels(series, Config.GRAPH_LABEL_THRESHOLD, '{:.2f}'))
+
+        plt.title(title)
+        plt.xlabel(x_label)
+        plt.ylabel(y_label)
+        plt.xticks(x + bar_width * (len(values) - 1) / 2, categories)
+        plt.legend()
+        plt.grid(True, axis='y')
+
+        categories_str = '-'.join(categories)
+        values_str = '-'.join(['-'.join([str(i) for i in series]) for series in values])
+        labels_str = '-'.join(labels)
+        file_name_non_hashed = f'{categories_str}-{values_str}-{labels_str}-{title}-{x_label}-{y_label}-{is_start_zero}'
+        return save_graph(file_name_non_hashed, output_format)
 
-    plt.title(title)
-    plt.xlabel(x_label)
-    plt.ylabel(y_label)
-    plt.xticks([p + bar_width * (len(values) - 1) / 2 for p in x], categories)
-    plt.legend()
-    plt.grid(True, axis='y')
-
-    categories_str = '-'.join(categories)
-    values_str = '-'.join(['-'.join([str(i) for i in series]) for series in values])
-    labels_str = '-'.join(labels)
-    file_name_non_hashed = f'{categories_str}-{values_str}-{labels_str}-{title}-{x_label}-{y_label}-{is_start_zero}'
-    file_name = hashlib.sha256(file_name_non_hashed.encode()).hexdigest()
-    if not os.path.exists(Config.GRAPH_DIRECTORY):
-        os.makedirs(Config.GRAPH_DIRECTORY)
-    
-    file_path = os.path.join(Config.GRAPH_DIRECTORY, f'{file_name}.png')
-    plt.savefig(file_path, bbox_inches='tight')
-    plt.close()
-
-    return f"{Config.FULL_GRAPH_DIRECTORY}/{file_name}.png"
 class PieGraph(BaseModel):
     labels: List[str] = Field(..., description="Les étiquettes pour chaque proportion.")
     sizes: List[float] = Field(..., description="Les proportions correspondantes.")
     title: str = Field(..., description="Le titre du graphique. (en français)")
+    output_format: Optional[GraphFormat] = Field(None, description="Le format de l'image (png, webp ou svg). Laisser vide pour le format par défaut.")
 
 @tool("create_pie_graph", args_schema=PieGraph)
-async def create_pie_graph(labels: List[str], sizes: List[float], title: str):
+async def create_pie_graph(labels: List[str], sizes: List[float], title: str, output_format: Optional[str] = None):
     """Ce tool permet de créer un graphique de proportions à partir des données fournies."""
-    plt.figure(figsize=(8, 8))
-    plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140)
-    plt.title(title)
-    plt.axis('equal')
-
-    labels_str = '-'.join(labels)
-    sizes_str = '-'.join([str(i) for i in sizes])
-    file_name_non_hashed = f'{labels_str}-{sizes_str}-{title}'
-    file_name = hashlib.sha256(file_name_non_hashed.encode()).hexdigest()
-    if not os.path.exists(Config.GRAPH_DIRECTORY):
-        os.makedirs(Config.GRAPH_DIRECTORY)
-        
-    file_path = os.path.join(Config.GRAPH_DIRECTORY, f'{file_name}.png')
-    plt.savefig(file_path, bbox_inches='tight')
-    plt.close()
-
-    return f"{Config.FULL_GRAPH_DIRECTORY}/{file_name}.png"
+    with render_lock:
+        plt = get_pyplot()
+        plt.figure(figsize=(8, 8))
+        plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140)
+        plt.title(title)
+        plt.axis('equal')
+
+        labels_str = '-'.join(labels)
+        sizes_str = '-'.join([str(i) for i in sizes])
+        file_name_non_hashed = f'{labels_str}-{sizes_str}-{title}'
+        return save_graph(file_name_non_hashed, output_format)
 
 class PieGraphSubplots(BaseModel):
     labels: List[List[str]] = Field(..., description="Les étiquettes pour chaque proportion. (une liste de listes)")
     sizes: List[List[float]] = Field(..., description="Les proportions correspondantes. (une liste de listes)")
     title: str = Field(..., description="Le titre du graphique. (en français)")
     subplots_titles: List[str] = Field(..., description="Les titres pour chaque sous-graphique.")
+    output_format: Optional[GraphFormat] = Field(None, description="Le format de l'image (png, webp ou svg). Laisser vide pour le format par défaut.")
 
 @tool("create_pie_graph_w_subplots", args_schema=PieGraphSubplots)
-async def create_pie_graph_w_subplots(labels: List[List[str]], sizes: List[List[float]], title: str, subplots_titles: List[str]):
+async def create_pie_graph_w_subplots(labels: List[List[str]], sizes: List[List[float]], title: str, subplots_titles: List[str], output_format: Optional[str] = None):
     """Ce tool permet de créer un graphique de proportions à partir des données fournies avec des sous-graphiques si plusieurs séries de données sont fournies."""
-    num_plots = len(labels)
-    max_cols = 3
-    num_rows = math.ceil(num_plots / max_cols)
-    num_cols = min(num_plots, max_cols)
-
-    fig, axs = plt.subplots(num_rows, num_cols, figsize=(5 * num_cols, 5 * num_rows))
-    fig.suptitle(title)
+    with render_lock:
+        plt = get_pyplot()
+        num_plots = len(labels)
+        max_cols = 3
+        num_rows = math.ceil(num_plots / max_cols)
+        num_cols = min(num_plots, max_cols)
+
+        fig, axs = plt.subplots(num_rows, num_cols, figsize=(5 * num_cols, 5 * num_rows))
+        fig.suptitle(title)
     
-    for i, (label, size) in enumerate(zip(labels, sizes)):
-        row = i // max_cols
-        col = i % max_cols
-        ax = axs[row, col] if num_rows > 1 else axs[col]
-        ax.pie(size, labels=label, autopct='%1.1f%%', startangle=140)
-        ax.axis('equal')
-        ax.set_title(subplots_titles[i])
-
-    for j in range(num_plots, num_rows * num_cols):
-        row = j // max_cols
-        col = j % max_cols
-        ax = axs[row, col] if num_rows > 1 else axs[col]
-        ax.axis('off')
-
-    labels_str = '-'.join(['-'.join(label) for label in labels])
-    sizes_str = '-'.join(['-'.join([str(i) for i in size]) for size in sizes])
-    file_name_non_hashed = f'{labels_str}-{sizes_str}-{title}'
-    file_name = hashlib.sha256(file_name_non_hashed.encode()).hexdigest()
-    if not os.path.exists(Config.GRAPH_DIRECTORY):
-        os.makedirs(Config.GRAPH_DIRECTORY)
-
-    file_path = os.path.join(Config.GRAPH_DIRECTORY, f'{file_name}.png')
-    plt.savefig(file_path, bbox_inches='tight')
-    plt.close()
-
-    return f"{Config.FULL_GRAPH_DIRECTORY}/{file_name}.png"
+        for i, (label, size) in enumerate(zip(labels, sizes)):
+            row = i // max_cols
+            col = i % max_cols
+            ax = axs[row, col] if num_rows > 1 else axs[col]
+            ax.pie(size, labels=label, autopct='%1.1f%%', startangle=140)
+            ax.axis('equal')
+            ax.set_title(subplots_titles[i])
+
+        for j in range(num_plots, num_rows * num_cols):
+            row = j // max_cols
+            col = j % max_cols
+            ax = axs[row, col] if num_rows > 1 else axs[col]
+            ax.axis('off')
+
+        labels_str = '-'.join(['-'.join(label) for label in labels])
+        sizes_str = '-'.join(['-'.join([str(i) for i in size]) for size in sizes])
+        file_name_non_hashed = f'{labels_str}-{sizes_str}-{title}'
+        return save_graph(file_name_non_hashed, output_format)
 
 class Functions:
     def __init__(self) -> None:
@@ -1,13 +1,15 @@
 import chromadb
 from langchain_community.vectorstores import Chroma
-from .embeddings import initialize_embeddings
+from .embeddings import initialize_embeddings, check_collection_embedding_model
 
 class Retriever:
-    def __init__(self, chroma_host=None, chroma_port=None, collection_name=None, description=None, search_type="similarity", search_kwargs={"k": 10}):
+    def __init__(self, chroma_host=None, chroma_port=None, collection_name=None, description=None, search_type="similarity", search_kwargs={"k": 10}, hash_collection=None):
         self.embedding_function = initialize_embeddings()
         self.chroma_host = chroma_host
         self.chroma_port = chroma_port
         self.collection_name = collection_name
+        self.hash_collection = hash_collection
+        self.search_kwargs = search_kwargs
         self.client = self._initialize_client()
         self.collection = self._get_collection()
         self.db = self._initialize_db()
@@ -18,7 +20,9 @@ class Retriever:
         return chromadb.HttpClient(host=self.chroma_host, port=self.chroma_port)
 
     def _get_collection(self):
-        return self.client.get_collection(self.collection_name)
+        collection = self.client.get_collection(self.collection_name)
+        check_collection_embedding_model(collection)
+        return collection
 
     def _initialize_db(self):
         return Chroma(collection_name=self.collection.name, client=self.client, embedding_function=self.embedding_function)
@@ -16,6 +16,7 @@ class SessionManager:
         if not hasattr(self, "initialized"):
             self.store = {}
             self.sid_to_session = {}
+            self.session_to_user = {}
             self.init_message = initial_message
             self.initialized = True
 
@@ -69,9 +70,18 @@ class SessionManager:
         messages = self.store[session_id].messages
         return [self.serialize_message(msg) for msg in messages]
 
+    def get_session_messages_page(self, session_id, limit, position=0):
+        if not self.test_is_session_id(session_id):
+            return None, None
+        messages = self.store[session_id].messages
+        page = messages[position:position + limit]
+        next_position = position + len(page) if position + limit < len(messages) else None
+        return [self.serialize_message(msg) for msg in page], next_position
+
     def delete_session(self, session_id):
         if self.test_is_session_id(session_id):
             del self.store[session_id]
+            self.session_to_user.pop(session_id, None)
             return True
         return False
     
@@ -81,6 +91,12 @@ class SessionManager:
     def get_session_id_from_sid(self, sid: str) -> Optional[str]:
         return self.sid_to_session.get(sid)
 
+    def map_session_to_user(self, session_id: str, user_uuid: str):
+        self.session_to_user[session_id] = user_uuid
+
+    def get_user_key(self, session_id: str) -> str:
+        return self.session_to_user.get(session_id, session_id)
+
     def remove_sid_mapping(self, sid: str):
         if sid in self.sid_to_session:
             del self.sid_to_session[sid]
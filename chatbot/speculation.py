@@ -0,0 +1,96 @@
+import asyncio
+import math
+import re
+import unicodedata
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+STOPWORDS = {
+    "les", "des", "une", "pour", "par", "sur", "dans", "avec", "est", "sont", "qui", "que", "quoi",
+    "combien", "quel", "quelle", "quels", "quelles", "donnees", "donne", "entre", "aux", "the", "and",
+    "universite", "lausanne", "unil", "tool", "outil", "contient", "informations",
+}
+
+current_speculation: ContextVar[Optional["Speculation"]] = ContextVar("current_speculation", default=None)
+
+def tokenize(text: str, stem_length=6) -> set:
+    text = unicodedata.normalize('NFKD', text.casefold()).encode('ascii', 'ignore').decode()
+    return {word[:stem_length] for word in re.findall(r'[a-z0-9]+', text) if len(word) >= 3 and word not in STOPWORDS}
+
+class CollectionRouter:
+    def __init__(self, descriptions: Dict[str, str]):
+        self.tokens = {name: tokenize(f"{name.replace('_', ' ')} {description or ''}") for name, description in descriptions.items()}
+        document_frequency = {}
+        for tokens in self.tokens.values():
+            for token in tokens:
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+        total = max(len(self.tokens), 1)
+        self.idf = {token: math.log(total / count) + 1 for token, count in document_frequency.items()}
+
+    def route(self, question: str, limit: int) -> List[str]:
+        query_tokens = tokenize(question)
+        scores = []
+        for name, tokens in self.tokens.items():
+            score = sum(self.idf[token] for token in query_tokens & tokens)
+            if score > 0:
+                scores.append((score, name))
+        scores.sort(reverse=True)
+        return [name for _, name in scores[:limit]]
+
+def overlap(tokens_a: set, tokens_b: set) -> float:
+    if not tokens_a or not tokens_b:
+        return 0.0
+    return 2 * len(tokens_a & tokens_b) / (len(tokens_a) + len(tokens_b))
+
+class SpeculationStats:
+    def __init__(self):
+        self.launched = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted = 0
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'launched': self.launched,
+            'hits': self.hits,
+            'misses': self.misses,
+            'wasted': self.wasted,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+class Speculation:
+    def __init__(self, question: str, stats: SpeculationStats, min_overlap=0.5):
+        self.question = question
+        self.question_tokens = tokenize(question)
+        self.stats = stats
+        self.min_overlap = min_overlap
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.used = set()
+
+    def launch(self, collection_name, coroutine):
+        self.tasks[collection_name] = asyncio.create_task(coroutine)
+        self.stats.launched += 1
+
+    async def take(self, collection_name, query):
+        task = self.tasks.get(collection_name)
+        if task is None:
+            return None
+        if overlap(tokenize(query), self.question_tokens) < self.min_overlap:
+            self.stats.misses += 1
+            return None
+        try:
+            documents = await task
+        except Exception:
+            self.stats.misses += 1
+            return None
+        self.used.add(collection_name)
+        self.stats.hits += 1
+        return documents
+
+    def cancel(self):
+        self.stats.wasted += len(self.tasks.keys() - self.used)
+        for task in self.tasks.values():
+            if not task.done():
+                task.cancel()
+        self.tasks.clear()
@@ -0,0 +1,236 @@
+import asyncio
+import json
+import re
+from array import array
+from typing import Dict, List, Optional
+from .speculation import tokenize
+
+YEAR_KEYS = ('annee', 'année', 'year', 'an')
+FACULTY_KEYS = ('faculte', 'faculté', 'faculty', 'facultes', 'facultés')
+CHART_WORDS = {'graphi', 'courbe', 'evolut', 'diagra'}
+FILLER_WORDS = {'nombre', 'total', 'effect', 'chiffr', 'valeur', 'montan', 'annee', 'facult', 'inscri', 'avait', 'etait', 'ont', 'donne', 'moi', 'stp', 'svp'}
+COMPARISON_WORDS = {'differ', 'compar', 'pource', 'propor', 'rappor', 'ratio', 'moyenn', 'versus', 'contre', 'part'}
+YEAR_PATTERN = re.compile(r'\b(19\d{2}|20\d{2})\b')
+RANGE_PATTERN = re.compile(r'\b(19\d{2}|20\d{2})\s*(?:-|à|a|au|jusqu\'?en|et)\s*(19\d{2}|20\d{2})\b')
+
+def parse_records(document, metadata):
+    try:
+        parsed = json.loads(document) if document else None
+    except (ValueError, TypeError):
+        parsed = None
+    records = parsed if isinstance(parsed, list) else [parsed]
+    for record in records:
+        if isinstance(record, dict):
+            yield {**(metadata or {}), **record}
+        elif metadata:
+            yield dict(metadata)
+
+def find_key(record, keys):
+    for key in record:
+        if key.casefold() in keys:
+            return key
+    return None
+
+def format_value(value):
+    if float(value).is_integer():
+        return f"{int(value):,}".replace(',', "'")
+    return f"{value:,.2f}".replace(',', "'")
+
+class StatsTable:
+    def __init__(self):
+        self.indicators: List[str] = []
+        self.faculties: List[str] = []
+        self.indicator_ids: Dict[str, int] = {}
+        self.faculty_ids: Dict[str, int] = {}
+        self.indicator_column = array('H')
+        self.faculty_column = array('H')
+        self.year_column = array('H')
+        self.value_column = array('d')
+        self.index: Dict[tuple, int] = {}
+        self.series_index: Dict[tuple, List[int]] = {}
+
+    def _encode(self, values, ids, value):
+        if value not in ids:
+            ids[value] = len(values)
+            values.append(value)
+        return ids[value]
+
+    def add(self, indicator, faculty, year, value):
+        indicator_id = self._encode(self.indicators, self.indicator_ids, indicator)
+        faculty_id = self._encode(self.faculties, self.faculty_ids, faculty)
+        key = (indicator_id, faculty_id, year)
+        if key in self.index:
+            self.value_column[self.index[key]] = value
+            return
+        row = len(self.value_column)
+        self.indicator_column.append(indicator_id)
+        self.faculty_column.append(faculty_id)
+        self.year_column.append(year)
+        self.value_column.append(value)
+        self.index[key] = row
+        self.series_index.setdefault((indicator_id, faculty_id), []).append(row)
+
+    def lookup(self, indicator_id, faculty_id, year) -> Optional[float]:
+        row = self.index.get((indicator_id, faculty_id, year))
+        return None if row is None else self.value_column[row]
+
+    def series(self, indicator_id, faculty_id, start=None, end=None):
+        rows = sorted(self.series_index.get((indicator_id, faculty_id), []), key=lambda row: self.year_column[row])
+        return [
+            (self.year_column[row], self.value_column[row]) for row in rows
+            if (start is None or self.year_column[row] >= start) and (end is None or self.year_column[row] <= end)
+        ]
+
+    def __len__(self):
+        return len(self.value_column)
+
+class QueryMatcher:
+    def __init__(self, table: StatsTable):
+        self.table = table
+        self.indicator_tokens = [self._indicator_tokens(name) for name in table.indicators]
+        faculty_tokens = [tokenize(name) for name in table.faculties]
+        common = {token for token in set().union(*faculty_tokens) if sum(token in tokens for tokens in faculty_tokens) > len(faculty_tokens) / 2} if faculty_tokens else set()
+        self.faculty_tokens = [(tokens - common) or tokens for tokens in faculty_tokens]
+        self.common_faculty_tokens = common
+
+    def _indicator_tokens(self, name):
+        collection, _, field = name.partition(':')
+        tokens = tokenize(collection.replace('_', ' ')) | tokenize(field.replace('_', ' '))
+        return (tokens - FILLER_WORDS) or tokens
+
+    def _unexplained(self, query_tokens, indicator_id, faculty_id, years):
+        explained = self.indicator_tokens[indicator_id] | self.faculty_tokens[faculty_id] | self.common_faculty_tokens | FILLER_WORDS | CHART_WORDS | {str(year) for year in years}
+        return query_tokens - explained
+
+    def _best(self, query_tokens, candidates):
+        scores = sorted(
+            ((len(query_tokens & tokens) / len(tokens), len(query_tokens & tokens), i) for i, tokens in enumerate(candidates) if tokens and query_tokens & tokens),
+            reverse=True
+        )
+        if not scores:
+            return None, 0.0
+        ratio, count, best = scores[0]
+        if len(scores) == 1:
+            return best, ratio
+        second_ratio, second_count, _ = scores[1]
+        if (ratio, count) == (second_ratio, second_count):
+            return None, 0.0
+        margin = ratio - second_ratio if ratio != second_ratio else (count - second_count) / count
+        return best, ratio * min(1.0, 0.5 + margin)
+
+    def _best_faculty(self, query_tokens):
+        counts = sorted(((len(query_tokens & tokens), i) for i, tokens in enumerate(self.faculty_tokens) if query_tokens & tokens), reverse=True)
+        if not counts or (len(counts) > 1 and counts[1][0] == counts[0][0]):
+            return None, 0.0
+        return counts[0][1], 1.0
+
+    def match(self, question):
+        query_tokens = tokenize(question)
+        if query_tokens & COMPARISON_WORDS:
+            return None
+        indicator_id, indicator_score = self._best(query_tokens, self.indicator_tokens)
+        faculty_id, faculty_score = self._best_faculty(query_tokens)
+        if indicator_id is None or faculty_id is None:
+            return None
+        other_faculty_tokens = query_tokens - self.faculty_tokens[faculty_id]
+        if any(other_faculty_tokens & tokens for i, tokens in enumerate(self.faculty_tokens) if i != faculty_id):
+            return None
+        range_match = RANGE_PATTERN.search(question)
+        years = sorted({int(year) for year in YEAR_PATTERN.findall(question)})
+        if range_match:
+            start, end = sorted((int(range_match.group(1)), int(range_match.group(2))))
+        elif years:
+            start, end = years[0], years[-1]
+        else:
+            return None
+        unexplained = self._unexplained(query_tokens, indicator_id, faculty_id, years)
+        return {
+            'indicator_id': indicator_id,
+            'faculty_id': faculty_id,
+            'years': years,
+            'range': (start, end) if range_match or len(years) > 1 else None,
+            'chart': bool(query_tokens & CHART_WORDS),
+            'confidence': min(indicator_score, faculty_score) * 0.5 ** len(unexplained)
+        }
+
+class StatsEngine:
+    def __init__(self, table: StatsTable, min_confidence=0.8):
+        self.table = table
+        self.matcher = QueryMatcher(table)
+        self.min_confidence = min_confidence
+
+    @classmethod
+    def from_collections(cls, collections, min_confidence=0.8):
+        table = StatsTable()
+        for collection in collections:
+            data = collection.get(include=['documents', 'metadatas'])
+            for document, metadata in zip(data['documents'] or [], data['metadatas'] or []):
+                for record in parse_records(document, metadata):
+                    cls._add_record(table, collection.name, record)
+        return cls(table, min_confidence=min_confidence)
+
+    @staticmethod
+    def _add_record(table, collection_name, record):
+        year_key = find_key(record, YEAR_KEYS)
+        faculty_key = find_key(record, FACULTY_KEYS)
+        if year_key is None or faculty_key is None:
+            return
+        try:
+            year = int(record[year_key])
+        except (ValueError, TypeError):
+            return
+        for key, value in record.items():
+            if key in (year_key, faculty_key) or isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            table.add(f"{collection_name}:{key}", str(record[faculty_key]), year, float(value))
+
+    def describe(self, indicator_id):
+        collection, _, field = self.table.indicators[indicator_id].partition(':')
+        collection, field = collection.replace('_', ' '), field.replace('_', ' ')
+        if tokenize(field) <= tokenize(collection):
+            return collection.capitalize()
+        return f"{field.capitalize()} ({collection})"
+
+    def match(self, question):
+        if not len(self.table):
+            return None
+        match = self.matcher.match(question)
+        if match is None or match['confidence'] < self.min_confidence:
+            return None
+        return match
+
+    async def answer(self, match) -> Optional[str]:
+        indicator_id, faculty_id = match['indicator_id'], match['faculty_id']
+        indicator = self.describe(indicator_id)
+        faculty = self.table.faculties[faculty_id]
+        if match['range'] is None:
+            year = match['years'][0]
+            value = self.table.lookup(indicator_id, faculty_id, year)
+            if value is None:
+                return None
+            return f"{indicator} — {faculty}, {year} : {format_value(value)}."
+        series = self.table.series(indicator_id, faculty_id, *match['range'])
+        if len(series) < 2:
+            return None
+        lines = [f"| Année | {indicator} |", "|---|---|"] + [f"| {year} | {format_value(value)} |" for year, value in series]
+        answer = f"{indicator} — {faculty}, de {series[0][0]} à {series[-1][0]} :\n\n" + '\n'.join(lines)
+        if match['chart']:
+            from .function import render_line_graph
+            url = await asyncio.to_thread(
+                render_line_graph,
+                [year for year, _ in series],
+                [[int(value) if value.is_integer() else round(value, 2) for _, value in series]],
+                [faculty],
+                f"{indicator} — {faculty}",
+                "Année",
+                indicator,
+                True
+            )
+            answer += f"\n\n![{indicator}]({url})"
+        return answer
+
+    async def try_answer(self, question) -> Optional[str]:
+        match = self.match(question)
+        if match is None:
+            return None
+        return await self.answer(match)
@@ -1,12 +1,19 @@
 from langchain.tools.retriever import create_retriever_tool
-from typing import List, Union
+from typing import Dict, List, Union
 from langchain.tools import BaseTool
 from .function import Functions
+from .cache import RetrievalCache, CachedRetriever
+from .config import Config
 
 class Tools:
     def __init__(self):
         self.retrievers: List[BaseTool] = []
+        self.cached_retrievers: Dict[str, CachedRetriever] = {}
         self.functions: List[BaseTool] = Functions().get_all_functions()
+        self.retrieval_cache = RetrievalCache(
+            max_entries=Config.RETRIEVAL_CACHE_MAX_ENTRIES,
+            max_bytes=Config.RETRIEVAL_CACHE_MAX_BYTES
+        )
 
     def get_retrievers(self) -> List[BaseTool]:
         return self.retrievers
@@ -20,13 +27,30 @@ class Tools:
     def add_retriever(self, retriever):
         description = getattr(retriever, 'description', None) or "Aucune description"
         
+        self.retrieval_cache.set_version(retriever.collection_name, getattr(retriever, 'hash_collection', None))
+        cached_retriever = CachedRetriever(
+            retriever=retriever.get_retriver(),
+            cache=self.retrieval_cache,
+            collection_name=retriever.collection_name,
+            k=retriever.search_kwargs.get('k', 4)
+        )
         tool = create_retriever_tool(
-            retriever.get_retriver(),
+            cached_retriever,
             name=retriever.collection_name,
             description=description
         )
+        self.cached_retrievers[retriever.collection_name] = cached_retriever
         self.retrievers.append(tool)
+
+    def get_cached_retriever(self, name: str) -> Union[CachedRetriever, None]:
+        return self.cached_retrievers.get(name)
+
+    def get_retriever_descriptions(self) -> Dict[str, str]:
+        return {tool.name: tool.description for tool in self.retrievers}
     
+    def update_collection_versions(self, versions: dict):
+        return [name for name, version in versions.items() if self.get_retriever(name) and self.retrieval_cache.set_version(name, version)]
+
     def print_retrievers(self):
         for retriever in self.retrievers:
             print(retriever)
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import pytest
+from chatbot.stats import StatsEngine
+
+FACULTIES = [
+    "Faculté des lettres",
+    "Faculté des sciences sociales et politiques",
+    "Faculté des hautes études commerciales (HEC)",
+    "Faculté de théologie et de sciences des religions",
+]
+
+class FakeCollection:
+    def __init__(self, name, records):
+        self.name = name
+        self.records = records
+
+    def get(self, include):
+        return {
+            'documents': [json.dumps(record) for record in self.records],
+            'metadatas': [{} for _ in self.records]
+        }
+
+def make_records(field, base):
+    return [
+        {'annee': year, 'faculte': faculty, field: base + 10 * i + year - 2000}
+        for i, faculty in enumerate(FACULTIES)
+        for year in range(2015, 2024)
+    ]
+
+@pytest.fixture
+def engine():
+    return StatsEngine.from_collections([
+        FakeCollection('etudiants', make_records('nombre', 1000)),
+        FakeCollection('etudiants_etrangers', make_records('nombre', 100)),
+        FakeCollection('personnel', make_records('nombre', 500)),
+    ])
+
+def answer(engine, question):
+    return asyncio.run(engine.try_answer(question))
+
+@pytest.mark.parametrize("question", [
+    "Combien d'étudiants en Lettres en 2022 ?",
+    "combien d'étudiants en Lettres en 2022",
+    "Nombre d'étudiants en Lettres en 2022",
+    "Nombre d'étudiants inscrits à la Faculté des lettres en 2022",
+])
+def test_flagship_phrasings_hit_fast_path(engine, question):
+    assert answer(engine, question) == "Nombre (etudiants) — Faculté des lettres, 2022 : 1'022."
+
+def test_collection_disambiguates_shared_field(engine):
+    assert answer(engine, "Nombre d'étudiants étrangers en Lettres en 2022") == "Nombre (etudiants etrangers) — Faculté des lettres, 2022 : 122."
+    assert answer(engine, "Combien de personnel en HEC en 2020 ?") == "Nombre (personnel) — Faculté des hautes études commerciales (HEC), 2020 : 540."
+
+@pytest.mark.parametrize("question", [
+    "Nombre d'étudiants en master en Lettres en 2022",
+    "Nombre d'étudiants en Lettres en 2022 comparé aux sciences sociales",
+    "Différence d'étudiants entre Lettres et HEC en 2022",
+    "Pourcentage d'étudiants en Lettres en 2022",
+    "Nombre d'étudiants en sciences en 2022",
+    "Nombre d'étudiants en Lettres",
+    "Nombre d'étudiants en Lettres en 2030",
+])
+def test_qualified_or_ambiguous_questions_fall_back(engine, question):
+    assert answer(engine, question) is None
+
+def test_year_range_builds_table(engine):
+    result = answer(engine, "Étudiants en sciences sociales de 2016 à 2018")
+    assert result.splitlines()[0] == "Nombre (etudiants) — Faculté des sciences sociales et politiques, de 2016 à 2018 :"
+    assert "| 2017 | 1'027 |" in result
+
+def test_chart_words_flag_chart(engine):
+    match = engine.match("Graphique de l'évolution des étudiants en Lettres de 2016 à 2019")
+    assert match is not None and match['chart'] and match['range'] == (2016, 2019)